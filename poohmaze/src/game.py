@@ -1,17 +1,24 @@
 from __future__ import annotations
+from array import array
 import random
 
 import pygame 
 from configparser import ConfigParser
 from dataclasses import dataclass, field
+import logging
 import os
-from objects import Characters, Maze, maze_factory
+import threading
+import time
+from objects import Characters, Maze, MazeChange, maze_factory
 from misc import GameState, StateError
+from profiling import Profiler
 
-from objects.characters import DESIRED_FPS
-from objects.maze import get_opposite_direction
+from objects.characters import DESIRED_FPS, Badman, MazeRunner, preload_bitmaps
+from objects.maze import cells_between, get_direction_towards, get_opposite_direction
 
 
+logger = logging.getLogger(__name__)
+
 # DESIRED_FPS = 60
 
 @dataclass
@@ -20,6 +27,7 @@ class Display:
     screen: pygame.Surface
     screen_rect: pygame.Rect
     fullscreen: bool
+    fog: bool = False
 
     def __post_init__(self):
         window_style = pygame.FULLSCREEN if self.fullscreen else pygame.RESIZABLE
@@ -30,22 +38,110 @@ class Display:
         self.screen.fill((255, 255, 255))
 
     @classmethod
-    def create(cls, screenrect, fullscreen=False):
+    def create(cls, screenrect, fullscreen=False, fog=False):
         screen = cls(
             screen=None,
             screen_rect=screenrect,
             fullscreen=fullscreen,
+            fog=fog,
         )
         return screen
     
-    def resize(self):
-        size = self.screen.get_size()
+    def resize(self, size: tuple[int, int] = None):
+        size = size or self.screen.get_size()
         self.rect = pygame.Rect(0, 0, size[0], size[1])  
         window_style = pygame.FULLSCREEN if self.fullscreen else pygame.RESIZABLE
         self.screen = pygame.display.set_mode(size, window_style)
         pygame.display.update()
 
 
+@dataclass
+class Resizer:
+    """
+    Turns a burst of window resize events into one geometry rebuild.
+    Surfaces and masks for the new size are rendered on a worker
+    thread and swapped in at once, meanwhile the last frame is shown
+    scaled to the window.
+    """
+
+    delay: float = 0.15
+    size: tuple[int, int] | None = None
+    last_request: float = 0
+    placeholder: pygame.Surface | None = None
+    _job: threading.Thread | None = field(init=False, default=None)
+    _job_size: tuple[int, int] | None = field(init=False, default=None)
+    _rendered: dict | None = field(init=False, default=None)
+
+    @property
+    def pending(self) -> bool:
+        return self.size is not None
+
+    def request(self, screen: pygame.Surface, size: tuple[int, int]):
+        if self.placeholder is None:
+            self.placeholder = screen.copy()
+        self.size = size
+        # pygame.time.get_ticks stays at 0 without the timer subsystem
+        self.last_request = time.perf_counter()
+
+    def poll(self, game: Game) -> tuple[int, int] | None:
+        """
+        Returns the new size once its geometry has been swapped in.
+        """
+        if self._job is None:
+            if time.perf_counter() - self.last_request >= self.delay:
+                self._start(game)
+            return None
+        if self._job.is_alive():
+            return None
+        if self._job_size != self.size:
+            # Window changed again while rendering, drop the result and
+            # wait for the resizing to settle before starting over.
+            self._job = self._rendered = None
+            return None
+        size = self.size
+        game.update_geometry(size, self._rendered)
+        self.size = self.placeholder = self._job = self._rendered = None
+        return size
+
+    def _start(self, game: Game):
+        size = self._job_size = self.size
+
+        def render():
+            self._rendered = game.render_geometry(size)
+
+        self._job = threading.Thread(target=render, daemon=True)
+        self._job.start()
+
+    def draw_placeholder(self, screen: pygame.Surface):
+        screen.blit(
+            pygame.transform.scale(self.placeholder, screen.get_size()), (0, 0)
+        )
+
+
+@dataclass(frozen=True)
+class GameSnapshot:
+    """
+    Simulation state only, surfaces, masks and groups are left out.
+    Per runner arrays follow the order of `runners`. Pixel values are
+    for `size` and rescaled if the window has changed since.
+    """
+
+    walls: bytes
+    size: tuple[float, float]
+    characters: Characters
+    runners: tuple[MazeRunner, ...]
+    alive: bytes
+    # Rect centers
+    positions: array
+    # Float positions behind the rects, NaN where the rect was moved
+    # from outside since the runner last placed itself
+    exact_positions: array
+    # Badman only, in the order they appear in `runners`
+    targets: array
+    states: bytes
+    routes: tuple[tuple[tuple[int, int], ...], ...]
+
+
 @dataclass
 class Game:
 
@@ -55,9 +151,9 @@ class Game:
                                          default_factory=pygame.sprite.Group)
 
     @classmethod
-    def create(cls, maze_config, size):
-        maze = maze_factory(maze_config)
-        maze.generate()
+    def create(cls, maze_config, size, maze: Maze = None, rendered=None):
+        if maze is None:
+            maze = cls.create_maze(maze_config)
         # maze.update_video(size)
         # cell_size = maze.cell_dimensions
         characters = Characters.generate_characters(maze)
@@ -66,9 +162,21 @@ class Game:
             characters=characters
         )
         game._collect_sprites()
-        game.update_geometry(size)
+        game.update_geometry(size, rendered)
+        maze.subscribe(game._on_maze_change)
         return game
     
+    @staticmethod
+    def create_maze(maze_config) -> Maze:
+        levels = None
+        if maze_config.get('difficulty'):
+            # Pulls in multiprocessing, only worth it with a level pool
+            from objects.levels import LevelPool
+            levels = LevelPool.from_config(maze_config)
+        maze = maze_factory(maze_config, levels)
+        maze.generate()
+        return maze
+
     def reset(self, size: tuple[float, float]):
         self.maze.reset()
         self.maze.generate()
@@ -81,11 +189,139 @@ class Game:
         self.sprites.add(self.maze.borders.sprites())
         self.sprites.add(self.characters.all_chars.sprites())
 
-    def update_geometry(self, size):
-        self.maze.update_video(size)
+    def _on_maze_change(self, change: MazeChange):
+        # Killed borders leave every group on their own, only new ones
+        # have to be picked up.
+        for cell in change.cells:
+            self.sprites.add(cell.visual.borders.sprites())
+        changed = {(cell.row, cell.column) for cell in change.cells}
+        for enemy in self.characters.enemies:
+            location = self.maze.point_to_cell(enemy.rect.center)
+            if enemy.target and not enemy.is_waiting_for_target:
+                target = self.maze.point_to_cell(enemy.target)
+                if changed.intersection(cells_between(location, target)):
+                    # The wall may now stand in the way, step back to
+                    # the middle of the cell and plan again from there.
+                    cell = self.maze.grid(*location)
+                    enemy.target = cell.visual.get_center()
+                    enemy.route.clear()
+                    continue
+            else:
+                target = location
+            # Waypoints are joined by straight runs too.
+            for start, end in zip((target, *enemy.route), enemy.route):
+                if changed.intersection(cells_between(start, end)):
+                    enemy.route.clear()
+                    break
+
+    def snapshot(self) -> GameSnapshot:
+        chars = self.characters
+        runners = (
+            *chars.players_backup, *chars.enemies.sprites(), *chars.targets.backup
+        )
+        positions = array('i')
+        exact_positions = array('d')
+        targets = array('d')
+        states = bytearray()
+        routes = []
+        for runner in runners:
+            positions.extend(runner.rect.center)
+            exact_positions.extend(
+                runner.exact_position or (float('nan'), float('nan'))
+            )
+            if isinstance(runner, Badman):
+                targets.extend(runner.target or (float('nan'), float('nan')))
+                states.append(ord(runner.direction or '-'))
+                states.append(runner.is_waiting_for_target)
+                routes.append(tuple(runner.route))
+        alive = bytes(
+            bool(runner.groups()) for runner in runners
+        )
+        return GameSnapshot(
+            walls=self.maze.walls(),
+            size=self.size,
+            characters=chars,
+            runners=runners,
+            alive=alive,
+            positions=positions,
+            exact_positions=exact_positions,
+            targets=targets,
+            states=bytes(states),
+            routes=tuple(routes),
+        )
+
+    def restore(self, snapshot: GameSnapshot):
+        """
+        Puts the game back to `snapshot`, sprites are updated in place.
+        """
+        self.maze.set_walls(snapshot.walls)
+        if self.characters is not snapshot.characters:
+            self.characters = snapshot.characters
+            self._collect_sprites()
+        chars = self.characters
+        size = self.size
+        scale_x = size[0] / snapshot.size[0]
+        scale_y = size[1] / snapshot.size[1]
+        enemy = 0
+        for i, runner in enumerate(snapshot.runners):
+            x, y = snapshot.exact_positions[2*i], snapshot.exact_positions[2*i+1]
+            if x == x:
+                position = x * scale_x, y * scale_y
+                runner.rect.center = round(position[0]), round(position[1])
+                runner.restore_position(position)
+            else:
+                x, y = snapshot.positions[2*i], snapshot.positions[2*i+1]
+                runner.rect.center = round(x * scale_x), round(y * scale_y)
+                runner.restore_position(None)
+            if runner.previous_size != size:
+                # Not on screen at the last resize (taken before a reset)
+                runner.scale(self.maze.cell_dimensions)
+                runner.update_velocity(size)
+                runner.previous_size = size
+            if isinstance(runner, Badman):
+                x, y = snapshot.targets[2*enemy], snapshot.targets[2*enemy+1]
+                runner.target = None if x != x else (x * scale_x, y * scale_y)
+                direction = chr(snapshot.states[2*enemy])
+                runner.direction = None if direction == '-' else direction
+                runner.is_waiting_for_target = bool(snapshot.states[2*enemy+1])
+                runner.route.clear()
+                runner.route.extend(snapshot.routes[enemy])
+                enemy += 1
+            elif not snapshot.alive[i]:
+                runner.kill()
+            elif runner in chars.players_backup:
+                chars.players.add(runner)
+                chars.all_chars.add(runner)
+                self.sprites.add(runner)
+            else:
+                chars.targets.add(runner)
+                chars.all_chars.add(runner)
+                self.sprites.add(runner)
+
+    @property
+    def size(self) -> tuple[float, float]:
+        # Size the geometry was last built for
+        cell_width, cell_height = self.maze.cell_dimensions
+        return cell_width * self.maze.columns, cell_height * self.maze.rows
+
+    def render_geometry(self, size) -> dict:
+        """
+        Surfaces and masks of every sprite for `size`, keyed by sprite.
+        Nothing is changed, `update_geometry` applies them.
+        """
+        rendered = self.maze.render_video(size)
+        cell_size = size[0] / self.maze.columns, size[1] / self.maze.rows
+        for entity in self.characters.all_chars:
+            rendered[entity] = entity.render(cell_size)
+        return rendered
+
+    def update_geometry(self, size, rendered=None):
+        self.maze.update_video(size, rendered)
         cell_size = self.maze.cell_dimensions
         for entity in self.characters.all_chars:
-            entity.update_geometry(size, cell_size)
+            entity.update_geometry(
+                size, cell_size, rendered and rendered.get(entity)
+            )
             entity.previous_size = size
 
 
@@ -105,10 +341,19 @@ class Loop:
                 event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE
             ) or event.type == pygame.QUIT:
                 self.set_state(GameState.quitting)
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F9:
+                self.profiler.start_frames()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F10:
+                self.profiler.arm_reset()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_m:
+                self.poohmaze.toggle_minimap()
             # Delegate the event to a sub-event handler `handle_event`
             if event.type == pygame.WINDOWRESIZED:
-                self.display.resize()
-                self.poohmaze.update_game_geometry()
+                self.poohmaze.resizer.request(
+                    self.display.screen, (event.x, event.y)
+                )
+                if self.state != GameState.quitting:
+                    self.set_state(GameState.resizing)
         self.handle_event()
 
     def loop(self):
@@ -118,8 +363,10 @@ class Loop:
             if self.state == GameState.gameplay:
                 if not isinstance(self.poohmaze.gameloop, MazeLoop):
                     self.poohmaze.gameloop = MazeLoop(self.poohmaze)
-            self.poohmaze.gameloop.handle_events()
+            with self.profiler.frame():
+                self.poohmaze.gameloop.handle_events()
             clock.tick(DESIRED_FPS)
+        self.profiler.flush()
             
 
     def handle_event(self, event):
@@ -135,6 +382,10 @@ class Loop:
     def display(self):
         return self.poohmaze.display
 
+    @property
+    def profiler(self):
+        return self.poohmaze.profiler
+
     @property
     def state(self):
         return self.poohmaze.state
@@ -143,14 +394,48 @@ class Loop:
 class MazeLoop(Loop):
     
     def handle_event(self):
+        if self.state == GameState.resizing:
+            self.handle_resizing()
+            return
         self.display.screen.fill((255, 255, 255))
         self.move_characters()
         self.reset_players()
         if not self.game.characters.targets:
-            self.game.reset(self.display.screen.get_size())
+            with self.profiler.reset():
+                self.game.reset(self.display.screen.get_size())
         self.game.sprites.add(self.game.characters.all_chars.sprites())
-        for entity in self.game.sprites:
+        for entity in self.visible_sprites():
             self.display.screen.blit(entity.surf, entity.rect)
+        if self.poohmaze.minimap:
+            self.poohmaze.minimap.draw(
+                self.display.screen, self.game.maze, self.game.characters
+            )
+        pygame.display.flip()
+
+    def visible_sprites(self):
+        if not self.display.fog:
+            return self.game.sprites
+        maze = self.game.maze
+        visible = set()
+        for player in self.game.characters.players:
+            location = maze.point_to_cell(player.rect.center)
+            visible.update(maze.visibility.visible(location))
+        sprites = []
+        for location in visible:
+            sprites.extend(maze.grid(*location).visual.borders)
+        for entity in self.game.characters.all_chars:
+            if maze.point_to_cell(entity.rect.center) in visible:
+                sprites.append(entity)
+        return sprites
+
+    def handle_resizing(self):
+        resizer = self.poohmaze.resizer
+        size = resizer.poll(self.game)
+        if size:
+            self.display.resize(size)
+            self.set_state(GameState.gameplay)
+            return
+        resizer.draw_placeholder(self.display.screen)
         pygame.display.flip()
 
     def reset_players(self):
@@ -164,11 +449,10 @@ class MazeLoop(Loop):
         self.move_badmans()
 
     def move_players(self):
-        borders = self.game.maze.borders
         pressed_keys = pygame.key.get_pressed()
         for player in self.game.characters.players:
             if any(pressed_keys):
-                player.move(pressed_keys, borders)
+                player.move(pressed_keys, self.game.maze)
             pygame.sprite.spritecollide(
                 player,
                 self.game.characters.targets,
@@ -179,21 +463,13 @@ class MazeLoop(Loop):
     def move_badmans(self):
         for enemy in self.game.characters.enemies:
             if enemy.is_waiting_for_target:
-                position = enemy.rect.center
-                row_column = self.game.maze.point_to_cell(position)
-                current_cell = self.game.maze.grid(*row_column)
-                paths = current_cell.logic.get_paths()
-                if enemy.direction:
-                    if (o_d:=get_opposite_direction(enemy.direction)) in paths:
-                        if len(paths) > 1:
-                            random_number = random.uniform(0, 1)
-                            if random_number < 0.9:
-                                paths.remove(o_d)
-                dir = random.choice(paths)
-                enemy.direction = dir
-                new_cell = self.game.maze.adjacent_cell(current_cell, dir)
-                enemy.target = new_cell.visual.get_center()
-                enemy.is_waiting_for_target = False
+                if not enemy.route:
+                    self.plan_route(enemy)
+                if enemy.route:
+                    location = enemy.route.popleft()
+                    cell = self.game.maze.grid(*location)
+                    enemy.target = cell.visual.get_center()
+                    enemy.is_waiting_for_target = False
             else:
                 enemy.move() 
             pygame.sprite.spritecollide(
@@ -203,6 +479,34 @@ class MazeLoop(Loop):
                 pygame.sprite.collide_mask
             )
 
+    def plan_route(self, enemy):
+        """
+        Picks the next corridor for `enemy`. Decisions are only made
+        at junctions and dead ends, the corridor is then followed
+        waypoint by waypoint.
+        """
+        maze = self.game.maze
+        location = maze.point_to_cell(enemy.rect.center)
+        corridors = maze.junctions.exits(location)
+        paths = list(corridors)
+        if not paths:
+            return
+        for player in self.game.characters.players:
+            seen = maze.point_to_cell(player.rect.center)
+            if maze.visibility.can_see(location, seen):
+                if (chase := get_direction_towards(location, seen)) in corridors:
+                    paths = [chase]
+                    break
+        if enemy.direction:
+            if (o_d:=get_opposite_direction(enemy.direction)) in paths:
+                if len(paths) > 1:
+                    random_number = random.uniform(0, 1)
+                    if random_number < 0.9:
+                        paths.remove(o_d)
+        corridor = corridors[random.choice(paths)]
+        enemy.direction = corridor.heading
+        enemy.route.extend(corridor.waypoints)
+
     @property
     def game(self):
         return self.poohmaze.game
@@ -216,25 +520,35 @@ class PoohMaze:
     config: ConfigParser
     state: GameState
     gameloop: Loop = field(init=False)
+    profiler: Profiler = field(init=False, default_factory=Profiler.from_env)
+    resizer: Resizer = field(init=False, default_factory=Resizer)
+    minimap: Minimap | None = field(init=False, default=None)
+    started: float = field(default_factory=time.perf_counter)
+    time_to_first_frame: float | None = field(init=False, default=None)
 
     def __post_init__(self):
         self.gameloop = Loop(self)
 
     @classmethod
-    def create(cls):  
-        pygame.init()
+    def create(cls, started: float = None):  
         poohmaze = cls(
             display=None,
             game=None,
             config=None,
             state=GameState.starting
         )
+        if started is not None:
+            poohmaze.started = started
         poohmaze.init_config()
+        if poohmaze.config['display_window'].getboolean('fast_start', fallback=True):
+            # Audio, joystick and the rest are never used
+            pygame.display.init()
+        else:
+            pygame.init()
         poohmaze.init_display()
         poohmaze.init_game_backend(
             poohmaze.config['maze_config']
         )
-        poohmaze.update_game_geometry()
         return poohmaze
     
     def start(self): 
@@ -258,15 +572,58 @@ class PoohMaze:
         width = window_config.getint('screen_width')
         height = window_config.getint('screen_height')
         start_fullscreen = window_config.getboolean('start_fullscreen')
+        fog = window_config.getboolean('fog', fallback=False)
         rect = pygame.Rect(0, 0, width, height)
-        self.display = Display.create(rect, start_fullscreen)
+        self.display = Display.create(rect, start_fullscreen, fog)
         self.set_state(GameState.display_initialized)
 
     def init_game_backend(self, maze_config=None):
         self.assert_state_is(GameState.display_initialized)
+        bitmaps = preload_bitmaps()
+        size = self.display.screen.get_size()
+        self.show_first_frame()
+        maze = Game.create_maze(maze_config)
+        rendered = self.show_maze(maze, size)
+        bitmaps.join()
         # self.game = Game.create(maze_config, self)
-        self.game = Game.create(maze_config, self.display.screen.get_size())
+        self.game = Game.create(maze_config, size, maze, rendered)
         self.set_state(GameState.gameplay)
+
+    def show_first_frame(self):
+        """
+        Puts the blank window on screen before the maze, and with
+        `difficulty` set the level pool, are built. Records and logs
+        the time to first frame.
+        """
+        self.display.screen.fill((255, 255, 255))
+        pygame.display.flip()
+        self.time_to_first_frame = time.perf_counter() - self.started
+        logger.info("First frame after %.0f ms", self.time_to_first_frame * 1000)
+
+    def show_maze(self, maze: Maze, size) -> dict:
+        """
+        Draws the bare maze while the characters are still loading.
+        Returns the rendered borders, so `Game.create` can take them
+        over as they are.
+        """
+        rendered = maze.render_video(size)
+        self.display.screen.fill((255, 255, 255))
+        for surf, rect, _ in rendered.values():
+            self.display.screen.blit(surf, rect)
+        pygame.display.flip()
+        logger.info("Maze shown after %.0f ms", (time.perf_counter() - self.started) * 1000)
+        return rendered
+
+    def toggle_minimap(self):
+        if self.minimap is None:
+            try:
+                # numpy only gets imported once the minimap is asked for
+                from minimap import Minimap
+            except ImportError:
+                # pygame.surfarray needs numpy, play on without a minimap
+                return
+            self.minimap = Minimap()
+        self.minimap.toggle()
     
     def set_state(self, new_state):
         self.state = new_state
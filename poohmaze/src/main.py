@@ -1,7 +1,18 @@
-from game import PoohMaze
+import time
+STARTED = time.perf_counter()
+
+import logging
+import os
+
 
 def start_game():
-    app = PoohMaze.create()
+    # e.g. POOHMAZE_LOG=INFO reports the time to first frame
+    level = logging.getLevelName(os.environ.get('POOHMAZE_LOG', 'WARNING').upper())
+    logging.basicConfig(level=level if isinstance(level, int) else logging.WARNING)
+    # Imported here, spawned worker processes run this module again
+    # and must not pull in pygame.
+    from game import PoohMaze
+    app = PoohMaze.create(STARTED)
     app.start()
 
 
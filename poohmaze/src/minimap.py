@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pygame
+
+from objects import Characters, Maze
+from objects.characters import Badman, Player
+from objects.maze import WALL_BITS
+
+
+OPEN_COLOR = (255, 255, 255)
+WALL_COLOR = (0, 0, 0)
+DOT_COLORS = {
+    Player: (40, 90, 220),
+    Badman: (220, 40, 40),
+}
+TARGET_COLOR = (230, 180, 0)
+
+
+def render_walls(rows: int, columns: int, walls: bytes) -> pygame.Surface:
+    """
+    One pixel per cell and one per wall: a (2 * columns + 1) x
+    (2 * rows + 1) surface built from `Maze.walls` in a single
+    vectorised pass.
+    """
+    bits = np.frombuffer(walls, dtype=np.uint8).reshape(rows, columns)
+    open_cells = np.zeros((2 * rows + 1, 2 * columns + 1), dtype=bool)
+    open_cells[1::2, 1::2] = True
+    open_cells[1::2, 2::2] = (bits & (1 << WALL_BITS.index('r'))) == 0
+    open_cells[2::2, 1::2] = (bits & (1 << WALL_BITS.index('b'))) == 0
+    pixels = np.where(open_cells[..., None], OPEN_COLOR, WALL_COLOR).astype(np.uint8)
+    surface = pygame.Surface((2 * columns + 1, 2 * rows + 1))
+    # surfarray is indexed x first
+    pygame.surfarray.blit_array(surface, pixels.transpose(1, 0, 2))
+    return surface
+
+
+@dataclass
+class Minimap:
+    """
+    Zoomed out view of the whole maze in a corner of the screen. The
+    wall image is only rebuilt when `Maze.version` changes.
+    """
+
+    fraction: float = 0.25
+    visible: bool = False
+    _version: int | None = field(init=False, default=None)
+    _walls: pygame.Surface | None = field(init=False, default=None)
+    _scaled: pygame.Surface | None = field(init=False, default=None)
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def draw(self, screen: pygame.Surface, maze: Maze, characters: Characters):
+        if not self.visible:
+            return
+        width = int(screen.get_width() * self.fraction)
+        height = int(screen.get_height() * self.fraction)
+        if self._version != maze.version:
+            self._walls = render_walls(maze.rows, maze.columns, maze.walls())
+            self._version = maze.version
+            self._scaled = None
+        if self._scaled is None or self._scaled.get_size() != (width, height):
+            self._scaled = pygame.transform.scale(self._walls, (width, height))
+        left = screen.get_width() - width
+        screen.blit(self._scaled, (left, 0))
+        # Cell (row, column) sits on pixel (2 * column + 1, 2 * row + 1)
+        pixel_width = width / (2 * maze.columns + 1)
+        pixel_height = height / (2 * maze.rows + 1)
+        radius = max(1, int(min(pixel_width, pixel_height)))
+        for entity in characters.all_chars:
+            row, column = maze.point_to_cell(entity.rect.center)
+            center = (
+                left + (2 * column + 1.5) * pixel_width,
+                (2 * row + 1.5) * pixel_height
+            )
+            color = DOT_COLORS.get(type(entity), TARGET_COLOR)
+            pygame.draw.circle(screen, color, center, radius)
@@ -1,4 +1,19 @@
-__all__ = ['Maze', 'Characters', 'maze_factory']
+import importlib
 
-from .maze import Maze, maze_factory
-from .characters import Characters
\ No newline at end of file
+__all__ = ['Maze', 'MazeChange', 'Characters', 'maze_factory']
+
+# Loaded on first use, so worker processes that only unpickle
+# `objects.tiles` jobs never import pygame.
+_EXPORTS = {
+    'Maze': 'maze',
+    'MazeChange': 'maze',
+    'maze_factory': 'maze',
+    'Characters': 'characters',
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        module = importlib.import_module(f'.{_EXPORTS[name]}', __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
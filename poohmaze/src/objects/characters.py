@@ -1,6 +1,8 @@
 from __future__ import annotations
+from collections import deque
 from dataclasses import dataclass, field
 from math import sqrt
+import threading
 from typing import Any, Iterable
 import pygame
 from pygame.math import Vector2
@@ -21,9 +23,39 @@ from pygame.locals import (
 )
 from pygame.sprite import AbstractGroup
 
+from .collision import slide
 from .maze import Maze
 
-DESIRED_FPS = 100
+DESIRED_FPS = 60
+
+PLAYER_BITMAP = r'poohmaze\assets\coala_tigger_bigger.png'
+BADMAN_BITMAP = r'poohmaze\assets\badman.png'
+TARGET_BITMAP = r'poohmaze\assets\star.png'
+
+_bitmaps: dict[str, pygame.Surface] = {}
+
+
+def load_bitmap(path: str) -> pygame.Surface:
+    # Runners only read their bitmap, so one copy per file is shared
+    if path not in _bitmaps:
+        _bitmaps[path] = pygame.image.load(path).convert_alpha()
+    return _bitmaps[path]
+
+
+def preload_bitmaps(
+        paths=(PLAYER_BITMAP, BADMAN_BITMAP, TARGET_BITMAP)
+    ) -> threading.Thread:
+    """
+    Loads the bitmaps in the background, join the returned thread
+    before creating characters.
+    """
+    def load():
+        for path in paths:
+            load_bitmap(path)
+
+    thread = threading.Thread(target=load, daemon=True)
+    thread.start()
+    return thread
 
 @dataclass
 class Characters:
@@ -43,7 +75,7 @@ class Characters:
 
     @classmethod
     def generate_characters(cls, maze: Maze):
-        player = Player(r'poohmaze\assets\coala_tigger_bigger.png')
+        player = Player(PLAYER_BITMAP)
         # player_two = Player(r'poohmaze\assets\pingwin.png', True)
         players = pygame.sprite.Group()
         players.add(player)
@@ -80,7 +112,7 @@ class Enemies(pygame.sprite.Group):
 
     def add_enemies(self, maze: Maze, number: int = 3):
         for _ in range(number):
-            badman = Badman(r'poohmaze\assets\badman.png')
+            badman = Badman(BADMAN_BITMAP)
             badman.starting_coordinates = maze.random_location()
             self.add(badman)
 
@@ -92,9 +124,12 @@ class Targets(pygame.sprite.Group):
         self.add_targets(maze)
 
     def add_targets(self, maze: Maze, number: int = 5):
-        for _ in range(number):
-            target = MazeRunner(r'poohmaze\assets\star.png')
-            target.starting_coordinates = maze.random_location()
+        locations = maze.target_locations or [
+            maze.random_location() for _ in range(number)
+        ]
+        for location in locations:
+            target = MazeRunner(TARGET_BITMAP)
+            target.starting_coordinates = location
             self.add(target)
             self.backup.append(target)
     
@@ -105,7 +140,7 @@ class MazeRunner(pygame.sprite.Sprite):
 
     def __init__(self, bitmap_path: str) -> None:
         super().__init__()
-        self.bitmap = pygame.image.load(bitmap_path).convert_alpha()
+        self.bitmap = load_bitmap(bitmap_path)
         self.surf = self.bitmap
         # self.position: Vector2 = None
         # self.velocity = Vector2(0,0)
@@ -117,17 +152,22 @@ class MazeRunner(pygame.sprite.Sprite):
         self.speed_y = None
         self.previous_size = None
         self.starting_coordinates = None
+        self._placed_at = None
 
-    def update_geometry(self, size, cell_size):
+    def update_geometry(self, size, cell_size, rendered=None):
         self.update_position_after_resize(size, cell_size)
-        self.scale(cell_size)
+        self.scale(cell_size, rendered=rendered)
         self.update_velocity(size)
 
-    def scale(self, cell_size, scaling_factor = 0.8):
-        size = scaling_factor * cell_size[0], scaling_factor * cell_size[1]
-        self.surf = pygame.transform.scale(self.bitmap, size)
+    def scale(self, cell_size, scaling_factor = 0.8, rendered=None):
+        self.surf, self.mask = rendered or self.render(cell_size, scaling_factor)
         self.rect = self.surf.get_rect(center=self.rect.center)
-        self.mask = pygame.mask.from_surface(self.surf)
+
+    def render(self, cell_size, scaling_factor = 0.8):
+        # Leaves the sprite alone, safe to call from a worker thread
+        size = scaling_factor * cell_size[0], scaling_factor * cell_size[1]
+        surf = pygame.transform.scale(self.bitmap, size)
+        return surf, pygame.mask.from_surface(surf)
 
     def update_position_after_resize(self, size: tuple, cell_size):
         # Calculate the new position of the object based on the resize ratio
@@ -140,8 +180,10 @@ class MazeRunner(pygame.sprite.Sprite):
         self.rect.center = x, y
 
     def update_velocity(self, size: tuple):
-        self.speed_y = (size[1] / 200) / (DESIRED_FPS/60)
-        self.speed_x = (size[0] / 200)  / (DESIRED_FPS/60)
+        # A sixth of the window per second, what moving whole pixels
+        # at 100 FPS used to give in a 600 pixel window.
+        self.speed_y = (size[1] / 6) / DESIRED_FPS
+        self.speed_x = (size[0] / 6) / DESIRED_FPS
 
     def set_starting_position(self, cell_size):
         x = cell_size[0]*(self.starting_coordinates[0] + 0.5)
@@ -150,6 +192,31 @@ class MazeRunner(pygame.sprite.Sprite):
         self.rect.center = self.position.x, self.position.y
         # raise NotImplementedError
 
+    @property
+    def exact_position(self) -> Vector2 | None:
+        """
+        The float position behind `rect`, None if the rect has been
+        moved from outside since the runner last placed itself.
+        """
+        return self.position if self.rect.center == self._placed_at else None
+
+    def restore_position(self, position: tuple[float, float] | None):
+        # Goes with a restored `rect`, None falls back to its center
+        if position is None:
+            self._placed_at = None
+        else:
+            self.position = Vector2(position)
+            self._placed_at = self.rect.center
+
+    def _sync_position(self):
+        if self.rect.center != self._placed_at:
+            # Moved from outside (reset, resize, restore)
+            self.position = Vector2(self.rect.center)
+
+    def _place(self):
+        self.rect.center = round(self.position.x), round(self.position.y)
+        self._placed_at = self.rect.center
+
 
 class Player(MazeRunner):
 
@@ -164,6 +231,7 @@ class Player(MazeRunner):
             self.down = K_s
             self.right = K_d
             self.left = K_a
+        self._update_hitbox()
 
     def set_starting_position(self, cell_size):
         x = cell_size[0]/2
@@ -171,44 +239,36 @@ class Player(MazeRunner):
         self.position = Vector2(x, y)
         self.rect.center = self.position.x, self.position.y
 
-    # Move the sprite based on keypresses
-    def vertical_move(self, pressed_keys, velocity=1):
-        # velocity = self.velocity * velocity
-        if pressed_keys[self.up]:
-            self.rect.move_ip(0, -velocity)
-        if pressed_keys[self.down]:
-            self.rect.move_ip(0, velocity)
-
-    # Move the sprite based on keypresses
-    def horizontal_move(self, pressed_keys, velocity=1):
-        # velocity = self.velocity * velocity
-        if pressed_keys[self.left]:
-            self.rect.move_ip(-velocity, 0)
-        if pressed_keys[self.right]:
-            self.rect.move_ip(velocity, 0)
-
-    def check_borders_collisions(self, borders):
-        if borders:=pygame.sprite.spritecollide(
-                self, 
-                borders, 
-                False, 
-                pygame.sprite.collide_rect
-            ):
-            return pygame.sprite.spritecollide(
-                    self, 
-                    borders, 
-                    False, 
-                    pygame.sprite.collide_mask
-            )
-
-    def move(self, pressed_keys, borders):
+    def scale(self, cell_size, scaling_factor = 0.8, rendered=None):
+        super().scale(cell_size, scaling_factor, rendered)
+        self._update_hitbox()
+
+    def _update_hitbox(self):
+        # Opaque part of the bitmap, relative to the top left of `rect`
+        bounds = self.mask.get_bounding_rects()
+        self.hitbox = bounds[0].unionall(bounds[1:]) if bounds else self.surf.get_rect()
+
+    def move(self, pressed_keys, maze: Maze):
+        """
+        Sweeps the hitbox along the whole step and slides along the
+        walls it runs into.
+        """
         velocity = self.compute_velocity(pressed_keys)
-        self.horizontal_move(pressed_keys, velocity[0])
-        if self.check_borders_collisions(borders):
-            self.horizontal_block(pressed_keys, velocity[0])
-        self.vertical_move(pressed_keys, velocity[1])
-        if self.check_borders_collisions(borders):
-            self.vertical_block(pressed_keys, velocity[1])
+        dx = (pressed_keys[self.right] - pressed_keys[self.left]) * velocity[0]
+        dy = (pressed_keys[self.down] - pressed_keys[self.up]) * velocity[1]
+        # The rounded center can leave the hitbox overlapping a wall,
+        # `slide` pushes it back out before moving.
+        self._sync_position()
+        left = self.position.x - self.rect.width/2 + self.hitbox.x
+        top = self.position.y - self.rect.height/2 + self.hitbox.y
+        box = left, top, self.hitbox.width, self.hitbox.height
+        walls = maze.wall_rects(
+            min(left, left + dx), min(top, top + dy),
+            max(left, left + dx) + box[2], max(top, top + dy) + box[3]
+        )
+        x, y = slide(box, (dx, dy), walls)
+        self.position += (x - left, y - top)
+        self._place()
 
     def compute_velocity(self, pressed_keys):
         # absolute_v = self.velocity * absolute_v
@@ -223,20 +283,6 @@ class Player(MazeRunner):
         # velocity = is_horizontal/d, is_vertical/d
         return velocity
 
-    def vertical_block(self, pressed_keys, velocity=1):
-        # velocity = self.velocity * velocity
-        if pressed_keys[self.up]:
-            self.rect.move_ip(0, velocity)
-        if pressed_keys[self.down]:
-            self.rect.move_ip(0, -velocity)
-
-    def horizontal_block(self, pressed_keys, velocity=1):
-        # velocity = self.velocity * velocity
-        if pressed_keys[self.left]:
-            self.rect.move_ip(velocity, 0)
-        if pressed_keys[self.right]:
-            self.rect.move_ip(-velocity, 0)
-
 
 class Badman(MazeRunner):
 
@@ -246,6 +292,8 @@ class Badman(MazeRunner):
         self.is_waiting_for_target = True
         self.target = None
         self.direction = None
+        # (row, column) waypoints left on the current corridor
+        self.route: deque[tuple[int, int]] = deque()
 
     def set_starting_position(self, cell_size):
         x = cell_size[0]*(self.starting_coordinates[0] + 0.5)
@@ -254,20 +302,23 @@ class Badman(MazeRunner):
         self.rect.center = self.position.x, self.position.y
 
     def move(self):
-        dx = self.target[0] - self.rect.center[0]
-        dy = self.target[1] - self.rect.center[1]
+        self._sync_position()
+        dx = self.target[0] - self.position.x
+        dy = self.target[1] - self.position.y
         distance = (dx**2 + dy**2)**0.5
         if distance > max(self.speed_x, self.speed_y):
-            # Calculate the movement vector
-            move_x = (dx / distance) * self.speed_x*0.9
-            move_y = (dy / distance) * self.speed_y*0.9
+            # Calculate the movement vector. Enemies are as fast as the
+            # player, truncating to whole pixels always ate the old 0.9.
+            move_x = (dx / distance) * self.speed_x
+            move_y = (dy / distance) * self.speed_y
             # Update the position
-            self.rect.move_ip(move_x, move_y)
+            self.position += (move_x, move_y)
         else:
             # If the distance is less than the speed, move directly to the target
-            self.rect.center = self.target[0], self.target[1]
+            self.position = Vector2(self.target)
             # self.rect.center[0] = self.target[0]
             self.is_waiting_for_target = True
+        self._place()
 
     def update_position_after_resize(self, size: tuple, cell_size):
         super().update_position_after_resize(size, cell_size)
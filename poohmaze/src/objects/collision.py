@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+import pygame
+
+
+# Kept between a box and the wall it stopped at, so the next sweep
+# does not start out touching it.
+SKIN = 1e-3
+
+
+def _penetration(
+        box: tuple[float, float, float, float],
+        wall: pygame.Rect
+    ) -> tuple[float, tuple[int, int]] | None:
+    """
+    How deep `box` overlaps `wall` and the normal that pushes it out
+    the shortest way, None if they do not overlap.
+    """
+    x, y, width, height = box
+    if (x >= wall.right or x + width <= wall.left
+            or y >= wall.bottom or y + height <= wall.top):
+        return None
+    return min(
+        (x + width - wall.left, (-1, 0)),
+        (wall.right - x, (1, 0)),
+        (y + height - wall.top, (0, -1)),
+        (wall.bottom - y, (0, 1)),
+    )
+
+
+def push_out(
+        box: tuple[float, float, float, float],
+        walls: Iterable[pygame.Rect]
+    ) -> tuple[float, float]:
+    """
+    Moves `box` out of every wall it overlaps, the shortest way each
+    time. Returns the new (x, y).
+    """
+    x, y, width, height = box
+    for wall in walls:
+        overlap = _penetration((x, y, width, height), wall)
+        if overlap:
+            depth, normal = overlap
+            x += normal[0] * (depth + SKIN)
+            y += normal[1] * (depth + SKIN)
+    return x, y
+
+
+def sweep(
+        box: tuple[float, float, float, float],
+        delta: tuple[float, float],
+        walls: Iterable[pygame.Rect]
+    ) -> tuple[float, tuple[int, int]]:
+    """
+    Swept AABB test of `box` (x, y, width, height) moving by `delta`.
+    Returns the fraction of `delta` that can be travelled before the
+    first hit and the normal of the wall that was hit, (1, (0, 0)) if
+    nothing is in the way. A wall the box already overlaps stops it
+    at once if the move goes deeper into it and is ignored if the move
+    leads out of it.
+    """
+    x, y, width, height = box
+    dx, dy = delta
+    first, normal = 1.0, (0, 0)
+    for wall in walls:
+        overlap = _penetration(box, wall)
+        if overlap:
+            _, out = overlap
+            if dx * out[0] + dy * out[1] < 0:
+                return 0.0, out
+            continue
+        if dx > 0:
+            x_entry, x_exit = wall.left - (x + width), wall.right - x
+        else:
+            x_entry, x_exit = wall.right - x, wall.left - (x + width)
+        if dy > 0:
+            y_entry, y_exit = wall.top - (y + height), wall.bottom - y
+        else:
+            y_entry, y_exit = wall.bottom - y, wall.top - (y + height)
+        if dx:
+            tx_entry, tx_exit = x_entry / dx, x_exit / dx
+        elif x + width <= wall.left or x >= wall.right:
+            continue
+        else:
+            tx_entry, tx_exit = float('-inf'), float('inf')
+        if dy:
+            ty_entry, ty_exit = y_entry / dy, y_exit / dy
+        elif y + height <= wall.top or y >= wall.bottom:
+            continue
+        else:
+            ty_entry, ty_exit = float('-inf'), float('inf')
+        entry = max(tx_entry, ty_entry)
+        exit = min(tx_exit, ty_exit)
+        if entry > exit or entry < 0 or entry >= first:
+            continue
+        first = entry
+        if tx_entry > ty_entry:
+            normal = (-1 if dx > 0 else 1, 0)
+        else:
+            normal = (0, -1 if dy > 0 else 1)
+    return first, normal
+
+
+def slide(
+        box: tuple[float, float, float, float],
+        delta: tuple[float, float],
+        walls: list[pygame.Rect],
+        iterations: int = 3
+    ) -> tuple[float, float]:
+    """
+    Moves `box` by `delta`, stopping at walls and sliding along them
+    with what is left of the move. A box that starts out overlapping a
+    wall, e.g. after a resize, is pushed out of it first. Returns the
+    new (x, y).
+    """
+    x, y, width, height = box
+    x, y = push_out(box, walls)
+    dx, dy = delta
+    for _ in range(iterations):
+        if not dx and not dy:
+            break
+        t, normal = sweep((x, y, width, height), (dx, dy), walls)
+        if t >= 1:
+            x, y = x + dx, y + dy
+            break
+        x += dx * t + normal[0] * SKIN
+        y += dy * t + normal[1] * SKIN
+        # Keep only the part of the move along the wall
+        if normal[0]:
+            dx = 0
+            dy *= 1 - t
+        else:
+            dy = 0
+            dx *= 1 - t
+    return x, y
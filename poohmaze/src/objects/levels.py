@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from bisect import insort
+from collections import deque
+from dataclasses import dataclass, field
+import multiprocessing
+import random
+
+from .maze import DIRECTION_OFFSETS, WALL_BITS, Maze
+
+
+BANDS = ('easy', 'medium', 'hard')
+
+
+@dataclass(frozen=True)
+class MazeMetrics:
+
+    cells: int
+    dead_ends: int
+    junctions: int
+    branching_factor: float
+    diameter: int
+    loops: int
+    target_distances: tuple[int, ...]
+
+    @property
+    def difficulty(self) -> float:
+        # Long walks to the targets and many dead ends make a maze
+        # harder, loops give the player ways around the enemies.
+        mean_distance = sum(self.target_distances) / max(len(self.target_distances), 1)
+        return (mean_distance / max(self.diameter, 1)
+                + (self.dead_ends - self.loops) / self.cells)
+
+
+@dataclass(frozen=True)
+class Level:
+
+    rows: int
+    columns: int
+    walls: bytes
+    targets: tuple[tuple[int, int], ...]
+    metrics: MazeMetrics
+
+
+def _neighbors(rows, columns, walls, index):
+    row, column = divmod(index, columns)
+    bits = walls[index]
+    for i, d in enumerate(WALL_BITS):
+        if not (bits >> i) & 1:
+            offset = DIRECTION_OFFSETS[d]
+            yield (row + offset[0]) * columns + column + offset[1]
+
+
+def _distances(rows, columns, walls, start) -> list[int]:
+    distances = [-1] * (rows * columns)
+    distances[start] = 0
+    queue = deque([start])
+    while queue:
+        index = queue.popleft()
+        for n in _neighbors(rows, columns, walls, index):
+            if distances[n] < 0:
+                distances[n] = distances[index] + 1
+                queue.append(n)
+    return distances
+
+
+def score_maze(rows: int, columns: int, walls: bytes, targets) -> MazeMetrics:
+    """
+    Computes the metrics of a maze given as `Maze.walls` bytes. The
+    player starts in the top left cell.
+    """
+    exits = [4 - bin(bits & 0b1111).count('1') for bits in walls]
+    dead_ends = exits.count(1)
+    junction_exits = [e for e in exits if e > 2]
+    branching_factor = (
+        sum(junction_exits) / len(junction_exits) if junction_exits else 0.0
+    )
+    passages = sum(exits) // 2
+    loops = passages - len(walls) + 1
+    distances = _distances(rows, columns, walls, 0)
+    # Double sweep, exact for perfect mazes and a close lower bound
+    # once loops are added.
+    farthest = distances.index(max(distances))
+    diameter = max(_distances(rows, columns, walls, farthest))
+    # Targets are placed at (column, row), see `MazeRunner.set_starting_position`.
+    for column, row in targets:
+        if not (0 <= column < columns and 0 <= row < rows):
+            raise ValueError(
+                f"Target {(column, row)} is outside a {rows}x{columns} maze"
+            )
+    target_distances = tuple(
+        distances[row * columns + column] for column, row in targets
+    )
+    return MazeMetrics(
+        cells=len(walls),
+        dead_ends=dead_ends,
+        junctions=len(junction_exits),
+        branching_factor=branching_factor,
+        diameter=diameter,
+        loops=loops,
+        target_distances=target_distances,
+    )
+
+
+def generate_level(rows: int, columns: int, targets: int, seed=None) -> Level:
+    # A private generator, so generating levels in the game process
+    # leaves the global one alone.
+    rng = random.Random(seed)
+    maze = Maze(rows, columns, 'standard')
+    maze.generation_strategy.generate(maze, rng)
+    walls = maze.walls()
+    locations = tuple(
+        (rng.randrange(columns), rng.randrange(rows)) for _ in range(targets)
+    )
+    metrics = score_maze(rows, columns, walls, locations)
+    return Level(rows, columns, walls, locations, metrics)
+
+
+def _generate_level(args) -> Level:
+    return generate_level(*args)
+
+
+@dataclass
+class LevelPool:
+    """
+    Pregenerated mazes ranked by difficulty. `fill` generates them in
+    worker processes, `take` hands them out by difficulty band.
+    """
+
+    rows: int
+    columns: int
+    targets: int = 5
+    levels: list[Level] = field(init=False, default_factory=list)
+
+    @classmethod
+    def from_config(cls, config):
+        pool = cls(config.getint('rows'), config.getint('columns'))
+        pool.fill(config.getint('pool_size', fallback=200))
+        return pool
+
+    def _jobs(self, count: int):
+        return (
+            (self.rows, self.columns, self.targets, random.getrandbits(64))
+            for _ in range(count)
+        )
+
+    def fill(self, count: int, processes: int = None, chunksize: int = 16):
+        seeds = self._jobs(count)
+        # Forked children inherit the initialised SDL display and hang,
+        # spawn gives them a clean interpreter.
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(processes) as workers:
+            for level in workers.imap_unordered(_generate_level, seeds, chunksize):
+                self.add(level)
+
+    def add(self, level: Level):
+        insort(self.levels, level, key=lambda l: l.metrics.difficulty)
+
+    def band(self, band: str) -> range:
+        i = BANDS.index(band)
+        size = len(self.levels)
+        return range(i * size // len(BANDS), (i + 1) * size // len(BANDS))
+
+    def take(self, band: str) -> Level:
+        if band not in BANDS:
+            raise ValueError(f"Unknown difficulty band {band!r}, expected one of {BANDS}")
+        if not self.band(band):
+            # Pool ran dry, top it up here rather than start workers.
+            for job in self._jobs(len(BANDS) * 4):
+                self.add(_generate_level(job))
+        return self.levels.pop(random.choice(self.band(band)))
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import random
+import time
+
+
+# Same bit layout as `Maze.walls`: t, b, l, r.
+_BITS = {'t': 1, 'b': 2, 'l': 4, 'r': 8}
+_OPPOSITE_BITS = {'t': 2, 'b': 1, 'l': 8, 'r': 4}
+_ALL_WALLS = 0b1111
+# Starting a spawned worker costs far more than carving a small board,
+# below this many cells `processes=None` carves in this process.
+PARALLEL_MIN_CELLS = 250_000
+
+
+def _carve_tile(walls, columns, top, left, height, width, seed):
+    """
+    Perfect maze inside one tile (recursive backtracker) written into
+    the flat `walls` buffer. Cells outside the tile are never touched,
+    so tiles can be carved side by side without locking.
+    """
+    rng = random.Random(seed)
+    visited = bytearray(height * width)
+    start = rng.randrange(height * width)
+    visited[start] = 1
+    stack = [start]
+    while stack:
+        local = stack[-1]
+        row, column = divmod(local, width)
+        options = []
+        if row > 0 and not visited[local - width]:
+            options.append(('t', local - width))
+        if row < height - 1 and not visited[local + width]:
+            options.append(('b', local + width))
+        if column > 0 and not visited[local - 1]:
+            options.append(('l', local - 1))
+        if column < width - 1 and not visited[local + 1]:
+            options.append(('r', local + 1))
+        if not options:
+            stack.pop()
+            continue
+        direction, neighbor = rng.choice(options)
+        visited[neighbor] = 1
+        stack.append(neighbor)
+        n_row, n_column = divmod(neighbor, width)
+        cell = (top + row) * columns + left + column
+        other = (top + n_row) * columns + left + n_column
+        walls[cell] &= ~_BITS[direction]
+        walls[other] &= ~_OPPOSITE_BITS[direction]
+
+
+def _carve_shared_tile(args):
+    name, columns, *tile = args
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        _carve_tile(memory.buf, columns, *tile)
+    finally:
+        memory.close()
+
+
+def _tiles(rows, columns, tile_size, rng):
+    for top in range(0, rows, tile_size):
+        for left in range(0, columns, tile_size):
+            height = min(tile_size, rows - top)
+            width = min(tile_size, columns - left)
+            yield top, left, height, width, rng.getrandbits(64)
+
+
+def _stitch(walls, rows, columns, tile_size, rng):
+    """
+    Joins the tiles along a random spanning tree of the tile grid,
+    one seam passage per tree edge, so the maze stays perfect.
+    """
+    tile_rows = -(-rows // tile_size)
+    tile_columns = -(-columns // tile_size)
+    visited = {(0, 0)}
+    stack = [(0, 0)]
+    while stack:
+        tile_row, tile_column = stack[-1]
+        options = [
+            (d, (tile_row + dr, tile_column + dc))
+            for d, dr, dc in (('b', 1, 0), ('t', -1, 0), ('r', 0, 1), ('l', 0, -1))
+            if 0 <= tile_row + dr < tile_rows
+            and 0 <= tile_column + dc < tile_columns
+            and (tile_row + dr, tile_column + dc) not in visited
+        ]
+        if not options:
+            stack.pop()
+            continue
+        direction, tile = rng.choice(options)
+        visited.add(tile)
+        stack.append(tile)
+        top = max(tile_row, tile[0]) * tile_size
+        left = max(tile_column, tile[1]) * tile_size
+        if direction in 'tb':
+            # Seam runs between rows `top - 1` and `top`.
+            width = min(tile_size, columns - tile_column * tile_size)
+            column = tile_column * tile_size + rng.randrange(width)
+            upper = (top - 1) * columns + column
+            walls[upper] &= ~_BITS['b']
+            walls[upper + columns] &= ~_BITS['t']
+        else:
+            height = min(tile_size, rows - tile_row * tile_size)
+            row = tile_row * tile_size + rng.randrange(height)
+            west = row * columns + left - 1
+            walls[west] &= ~_BITS['r']
+            walls[west + 1] &= ~_BITS['l']
+
+
+def generate_tiled_walls(
+        rows: int,
+        columns: int,
+        tile_size: int = 64,
+        processes: int = None,
+        seed=None
+    ) -> bytes:
+    """
+    Perfect maze as `Maze.walls` bytes. The grid is split into tiles of
+    `tile_size` cells, each tile is carved by a worker process straight
+    into shared memory and the tiles are stitched together afterwards.
+    Boards under `PARALLEL_MIN_CELLS` cells are carved in this process
+    unless `processes` is given.
+    """
+    rng = random.Random(seed)
+    tiles = list(_tiles(rows, columns, tile_size, rng))
+    if processes is None and rows * columns < PARALLEL_MIN_CELLS:
+        processes = 1
+    processes = min(processes or os.cpu_count(), len(tiles))
+    if processes <= 1:
+        walls = bytearray([_ALL_WALLS]) * (rows * columns)
+        for tile in tiles:
+            _carve_tile(walls, columns, *tile)
+    else:
+        memory = shared_memory.SharedMemory(create=True, size=rows * columns)
+        try:
+            memory.buf[:rows * columns] = bytes([_ALL_WALLS]) * (rows * columns)
+            jobs = [(memory.name, columns, *tile) for tile in tiles]
+            context = multiprocessing.get_context('spawn')
+            with context.Pool(processes) as workers:
+                workers.map(_carve_shared_tile, jobs, chunksize=1)
+            walls = bytearray(memory.buf[:rows * columns])
+        finally:
+            memory.close()
+            memory.unlink()
+    _stitch(walls, rows, columns, tile_size, rng)
+    return bytes(walls)
+
+
+def benchmark(rows: int, columns: int, tile_size: int = 256, max_processes: int = None):
+    """
+    Times `generate_tiled_walls` for 1, 2, 4, ... processes and prints
+    the speedup against a single process. This is the carving alone,
+    the time to build a `Maze` from the walls is not included.
+    """
+    max_processes = max_processes or os.cpu_count()
+    counts = sorted({1, max_processes} | {2**i for i in range(max_processes.bit_length())
+                                          if 2**i <= max_processes})
+    timings = {}
+    for processes in counts:
+        start = time.perf_counter()
+        generate_tiled_walls(rows, columns, tile_size, processes)
+        timings[processes] = time.perf_counter() - start
+        print(f"{rows}x{columns}, {processes} processes: "
+              f"{timings[processes]:.2f} s, speedup {timings[1] / timings[processes]:.2f}x")
+    return timings
+
+
+if __name__ == '__main__':
+    benchmark(2000, 2000)
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import cProfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+import os
+import pstats
+import warnings
+
+
+@dataclass
+class Profiler:
+    """
+    Profiles a chosen window of the game instead of the whole run:
+    either the next `frames` frames or the next `Game.reset`. Every
+    capture is written as a `.prof` file and as collapsed stacks for
+    flame graph tools.
+
+    Set from the environment with
+    `POOHMAZE_PROFILE=frames:300` or `POOHMAZE_PROFILE=reset`,
+    the files go to `POOHMAZE_PROFILE_DIR` (default `profiles`). Other
+    values are ignored with a warning. A frames capture still running
+    when the game quits is written out by `flush`.
+    """
+
+    output_dir: str = 'profiles'
+    default_frames: int = 300
+    frames_left: int = 0
+    reset_armed: bool = False
+    label: str = ''
+    _profile: cProfile.Profile | None = field(init=False, default=None)
+
+    @classmethod
+    def from_env(cls):
+        profiler = cls(output_dir=os.environ.get('POOHMAZE_PROFILE_DIR', 'profiles'))
+        request = os.environ.get('POOHMAZE_PROFILE', '')
+        kind, _, frames = request.partition(':')
+        if request == 'reset':
+            profiler.arm_reset()
+        elif kind == 'frames' and (not frames or frames.isdigit() and int(frames) > 0):
+            profiler.start_frames(int(frames) if frames else None)
+        elif request:
+            warnings.warn(
+                f"Ignoring POOHMAZE_PROFILE={request!r}, expected 'reset', "
+                f"'frames' or 'frames:<count>'"
+            )
+        return profiler
+
+    @property
+    def capturing(self) -> bool:
+        return self._profile is not None
+
+    def start_frames(self, frames: int = None):
+        if self.capturing:
+            return
+        self.frames_left = frames or self.default_frames
+        self.label = f'frames{self.frames_left}'
+        self._profile = cProfile.Profile()
+
+    def arm_reset(self):
+        self.reset_armed = True
+
+    @contextmanager
+    def frame(self):
+        """
+        Wraps the work of one frame. The frame rate sleep stays
+        outside, so it does not show up in the capture.
+        """
+        if not self.capturing:
+            yield
+            return
+        self._profile.enable()
+        try:
+            yield
+        finally:
+            self._profile.disable()
+            self.frames_left -= 1
+            if self.frames_left <= 0:
+                self._finish()
+
+    @contextmanager
+    def reset(self):
+        if not self.reset_armed or self.capturing:
+            yield
+            return
+        self.reset_armed = False
+        self.label = 'reset'
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        try:
+            yield
+        finally:
+            self._profile.disable()
+            self._finish()
+
+    def flush(self):
+        """
+        Writes out a frames capture that is still running, e.g. when
+        the game quits before it has seen all of its frames.
+        """
+        if self.capturing:
+            return self._finish()
+
+    def _finish(self):
+        profile, self._profile = self._profile, None
+        profile.create_stats()
+        if not profile.stats:
+            # Stopped before a single profiled frame, nothing to write.
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        base = os.path.join(self.output_dir, f'poohmaze-{stamp}-{self.label}')
+        profile.dump_stats(base + '.prof')
+        stats = pstats.Stats(profile)
+        with open(base + '.collapsed.txt', 'w') as file:
+            for stack, microseconds in collapse_stacks(stats).items():
+                if microseconds:
+                    file.write(f'{stack} {microseconds}\n')
+        return base
+
+
+def _frame_name(func) -> str:
+    filename, line, name = func
+    return f'{os.path.basename(filename)}:{name}:{line}'
+
+
+def collapse_stacks(stats: pstats.Stats, max_depth: int = 64) -> dict[str, int]:
+    """
+    Rebuilds `a;b;c microseconds` stacks from the caller/callee edges
+    of a profile. cProfile only keeps single edges, so time below a
+    function is split between its callees in proportion to the time
+    each call edge took.
+    """
+    callees: dict = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [
+        func for func, (_, _, _, _, callers) in stats.stats.items()
+        if not callers
+    ]
+    stacks: dict[str, int] = {}
+
+    def walk(func, path, time):
+        if time < 1e-6:
+            return
+        _, _, tottime, cumtime, _ = stats.stats[func]
+        path = path + [_frame_name(func)]
+        share = time / cumtime if cumtime else 0
+        key = ';'.join(path)
+        stacks[key] = stacks.get(key, 0) + int(tottime * share * 1e6)
+        if len(path) >= max_depth:
+            return
+        for callee, edge_time in callees.get(func, ()):
+            if _frame_name(callee) not in path:
+                walk(callee, path, edge_time * share)
+
+    for root in roots:
+        walk(root, [], stats.stats[root][3])
+    return stacks
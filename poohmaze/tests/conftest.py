@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The game runs from `src` with its modules at the top level.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
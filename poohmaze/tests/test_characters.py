@@ -0,0 +1,13 @@
+from types import SimpleNamespace
+
+import pytest
+
+from objects.characters import DESIRED_FPS, MazeRunner
+
+
+@pytest.mark.parametrize('size', [(600, 600), (900, 450)])
+def test_runners_cross_a_sixth_of_the_window_per_second(size):
+    runner = SimpleNamespace()
+    MazeRunner.update_velocity(runner, size)
+    assert runner.speed_x * DESIRED_FPS == pytest.approx(size[0] / 6)
+    assert runner.speed_y * DESIRED_FPS == pytest.approx(size[1] / 6)
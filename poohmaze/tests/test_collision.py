@@ -0,0 +1,117 @@
+"""
+Random walks through generated mazes with `slide`, no window needed.
+Walls are laid out like `Border` sprites: a strip along each standing
+side of a cell, as thick as 5% of the cell width.
+"""
+import random
+
+import pygame
+import pytest
+
+from objects.collision import _penetration, slide
+from objects.tiles import generate_tiled_walls
+
+WALL_BITS = {'t': 1, 'b': 2, 'l': 4, 'r': 8}
+MOVES = {'t': (0, -1), 'b': (0, 1), 'l': (-1, 0), 'r': (1, 0)}
+ROWS, COLUMNS = 8, 10
+
+
+def wall_rects(walls, cell_width, cell_height):
+    border = 0.05 * cell_width
+    rects = []
+    for index, bits in enumerate(walls):
+        row, column = divmod(index, COLUMNS)
+        x, y = column * cell_width, row * cell_height
+        sides = {
+            't': (x, y, cell_width, border),
+            'b': (x, y + cell_height - border, cell_width, border),
+            'l': (x, y, border, cell_height),
+            'r': (x + cell_width - border, y, border, cell_height),
+        }
+        for side, bit in WALL_BITS.items():
+            if bits & bit:
+                rects.append(pygame.Rect(*(int(v) for v in sides[side])))
+    return rects
+
+
+def open_between(walls, a, b):
+    (row, column), (other_row, other_column) = a, b
+    side = {(-1, 0): 't', (1, 0): 'b', (0, -1): 'l', (0, 1): 'r'}.get(
+        (other_row - row, other_column - column)
+    )
+    return side is not None and not walls[row * COLUMNS + column] & WALL_BITS[side]
+
+
+class Walker:
+    """
+    Box of 60% of a cell moved like `Player.move`. A resize rescales
+    the position and rounds it to whole pixels like the resync from
+    `rect.center` does, which can leave the box inside a wall.
+    """
+
+    def __init__(self, walls):
+        self.walls = walls
+        self.resize(60, 60)
+        self.x, self.y = 0.5 * self.cell_width, 0.5 * self.cell_height
+
+    def resize(self, cell_width, cell_height):
+        if hasattr(self, 'x'):
+            self.x = round(self.x * cell_width / self.cell_width)
+            self.y = round(self.y * cell_height / self.cell_height)
+        self.cell_width, self.cell_height = cell_width, cell_height
+        self.width, self.height = 0.6 * cell_width, 0.6 * cell_height
+        self.rects = wall_rects(self.walls, cell_width, cell_height)
+
+    @property
+    def box(self):
+        return (self.x - self.width / 2, self.y - self.height / 2,
+                self.width, self.height)
+
+    @property
+    def cell(self):
+        return int(self.y // self.cell_height), int(self.x // self.cell_width)
+
+    def step(self, dx, dy):
+        left, top, _, _ = self.box
+        x, y = slide(self.box, (dx, dy), self.rects)
+        self.x += x - left
+        self.y += y - top
+
+    def overlapping(self):
+        return [wall for wall in self.rects if _penetration(self.box, wall)]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_walk_changes_cell_only_through_open_walls(seed):
+    rng = random.Random(seed)
+    walls = generate_tiled_walls(ROWS, COLUMNS, 4, processes=1, seed=seed)
+    walker = Walker(walls)
+    cell = walker.cell
+    for step in range(2000):
+        if step % 100 == 99:
+            walker.resize(rng.uniform(30, 90), rng.uniform(30, 90))
+            cell = walker.cell
+        direction = rng.choice('tblr')
+        speed = rng.uniform(0.5, 0.3 * walker.cell_width)
+        walker.step(MOVES[direction][0] * speed, MOVES[direction][1] * speed)
+        assert not walker.overlapping(), (step, walker.box)
+        if walker.cell != cell:
+            assert open_between(walls, cell, walker.cell), (step, cell, walker.cell)
+            cell = walker.cell
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_long_steps_never_end_inside_a_wall(seed):
+    rng = random.Random(seed)
+    walls = generate_tiled_walls(ROWS, COLUMNS, 4, processes=1, seed=seed)
+    walker = Walker(walls)
+    for step in range(1000):
+        if step % 50 == 49:
+            walker.resize(rng.uniform(30, 90), rng.uniform(30, 90))
+        # Up to three cells per step, diagonals included
+        dx = rng.uniform(-3, 3) * walker.cell_width
+        dy = rng.uniform(-3, 3) * walker.cell_height
+        walker.step(dx, dy)
+        assert not walker.overlapping(), (step, walker.box)
+        row, column = walker.cell
+        assert 0 <= row < ROWS and 0 <= column < COLUMNS, (step, walker.box)